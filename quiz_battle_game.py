@@ -1,27 +1,130 @@
+import atexit
+import copy
+import argparse
 import json
+import mmap
 import os
 import sys
 import random
 import hashlib
+import heapq
 import re
+import select
+import shutil
+import struct
+import tempfile
+import time
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import Optional
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import termios
+except ImportError:
+    termios = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 USERS_FILE = "users.json"
 ADMINS_FILE = "admins.json"
 LEADERBOARD_FILE = "leaderboard.json"
+LEADERBOARD_DIR = "leaderboards"
 QUESTION_FILE = "questions.json"
+QUESTION_BANK_FILE = "questions.bank"
+ITEMS_FILE = "items.json"
+RESPONSE_TIMES_FILE = "response_times.json"
 SAVE_DIR = "saves"
+BATTLE_LOG_FILE = os.path.join(SAVE_DIR, "battles.jsonl")
 
 USERS = {}
 ADMINS = {}
 QUESTIONS = []
+# Read-only mmap of QUESTION_BANK_FILE. Pools map category -> difficulty -> [first record, count];
+# questions are referenced by record number and decoded one at a time.
+BANK = {"mm": None, "source_mtime": None, "pools": {}, "table": 0, "count": 0}
+BANK_MAGIC = b"QBNK"
+BANK_HEADER = struct.Struct("<4sIqI")  # magic, version, source mtime_ns, index length
+BANK_ENTRY = struct.Struct("<II")  # record offset, record length
+
+# question difficulties drawn for each battle difficulty
+BATTLE_POOLS = {"easy": ("easy",), "medium": ("easy", "medium"), "hard": ("medium", "hard"), "boss": ("boss",)}
+
+GAUNTLET_LENGTH = 5
 LEADERBOARD = []
 
+# Time-windowed boards. Score events are buffered and, when the leaderboard is committed, appended to
+# each window's journal (leaderboards/<kind>.log) on top of its snapshot (<kind>.json). Boards stay in
+# memory and only read journal lines they have not seen yet. A board whose window has passed is
+# archived read-only and restarted. Writers hold leaderboards/<kind>.lock (where fcntl is available)
+# while appending, rotating or compacting, so no process appends to a journal that is being replaced.
+LEADERBOARD_WINDOWS = ("daily", "weekly", "season")
+WINDOW_TITLES = {"all": "All-Time", "daily": "Today", "weekly": "This Week", "season": "This Season"}
+WINDOW_ARCHIVE_TOP = 100
+WINDOW_LOG_COMPACT_BYTES = 1 << 20
+WINDOW_BOARDS = {}
+PENDING_SCORE_EVENTS = []
+
 DEV_MODE = {"god_mode": False, "show_answers": False, "instant_win": False}
 
-ITEMS = {
-    "potion": {"name": "Healing Potion", "desc": "Restores 30 HP", "price": 50},
-    "shield": {"name": "Shield", "desc": "Blocks next hit", "price": 100},
+# Every battle draws from its own generator seeded from the session seed and a battle counter,
+# so a logged seed plus the logged turns replays the battle exactly.
+RNG = {"session_seed": None, "counter": 0}
+
+# Token buckets for login/password attempts: scope -> (capacity, tokens refilled per second).
+# "conn" is keyed by CONNECTION["id"], which a server front-end sets per client; locally it is one bucket.
+RATE_LIMITS = {"user": (5, 1 / 30), "conn": (20, 1 / 5)}
+RATE_LIMIT_MAX_ENTRIES = 10000
+RATE_LIMIT_TTL = 3600
+RATE_BUCKETS = OrderedDict()
+CONNECTION = {"id": "local"}
+
+# Normalized players by casefolded username: key -> (timestamp, (save file mtime_ns, player))
+PLAYER_CACHE_MAX_ENTRIES = 256
+PLAYER_CACHE_TTL = 600
+PLAYER_CACHE = OrderedDict()
+PLAYER_CACHE_STATS = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+TIMED_MODE = {"enabled": False, "seconds": 15.0}
+
+# upper bounds (seconds) of the response-time histogram buckets; the last bucket collects everything slower
+RESPONSE_TIME_BUCKETS = (1, 2, 3, 5, 8, 13)
+RESPONSE_TIMES = {}
+
+# "ansi" redraws with escape sequences; "plain" never clears (dumb terminals, pipes, logs). None = autodetect.
+RENDER = {"mode": None, "scroll_region": False}
+HUD_CACHE = []
+
+# Scripted input: "script" is a list of input lines replayed in place of the keyboard, "record" an open
+# file every typed line is appended to, and "fast" skips pauses and screen redraws.
+INPUT = {"script": None, "pos": 0, "record": None, "fast": False, "sessions": 0}
+
+# written to --record files in place of passwords; edit the recording before replaying it
+RECORD_SECRET_PLACEHOLDER = "<password>"
+# recorded for a timed answer that ran out of time; replayed as a timeout
+RECORD_TIMEOUT_MARKER = "<timeout>"
+# first line of a recording; load_script applies the seed so question order and enemy rolls match
+RECORD_SEED_HEADER = "#seed "
+
+class ScriptExhausted(Exception):
+    """Raised when a scripted session runs out of input lines."""
+
+ITEMS = {}
+ITEM_KEYS = []
+ITEM_DROP_WEIGHTS = []
+
+DEFAULT_ITEMS = {
+    "potion": {"name": "Healing Potion", "desc": "Restores 30 HP", "price": 50,
+               "effects": [{"type": "heal", "amount": 30}]},
+    "shield": {"name": "Shield", "desc": "Blocks next hit", "price": 100,
+               "effects": [{"type": "shield", "amount": 1}]},
 }
 
 DEFAULT_PLAYER = {
@@ -36,9 +139,43 @@ DEFAULT_PLAYER = {
     "gold": 0,
     "gold_bonus": 0,
     "inventory": {},
-    "shield_active": False
+    "effects": {}
 }
 
+def session_seed() -> int:
+    if RNG["session_seed"] is None:
+        RNG["session_seed"] = int.from_bytes(os.urandom(8), "big")
+    return RNG["session_seed"]
+
+def derive_seed(base: int, n) -> int:
+    return int.from_bytes(hashlib.sha256(f"{base}:{n}".encode()).digest()[:8], "big")
+
+def next_battle_seed() -> int:
+    RNG["counter"] += 1
+    return derive_seed(session_seed(), RNG["counter"])
+
+def seeded_rng(seed: int, stream: str) -> random.Random:
+    """Independent generator for one use ("enemy", "battle", ...) of a seed."""
+    return random.Random(f"{seed}:{stream}")
+
+def random_blocks(seed: int, n: int, block_size: int = 1 << 16):
+    """Yield n uniform floats in [0, 1) as blocks of up to block_size, for bulk simulation only.
+
+    Blocks are NumPy arrays when NumPy is installed and lists otherwise. The two paths produce
+    different streams for the same seed, so nothing that must replay may draw from here; use
+    seeded_rng for that.
+    """
+    if np is not None:
+        gen = np.random.default_rng(seed)
+        while n > 0:
+            yield gen.random(min(n, block_size))
+            n -= block_size
+        return
+    rng = random.Random(seed)
+    while n > 0:
+        yield [rng.random() for _ in range(min(n, block_size))]
+        n -= block_size
+
 def ensure_dirs():
     os.makedirs(SAVE_DIR, exist_ok=True)
 
@@ -68,21 +205,131 @@ def safe_json_write(path, data):
         print(f"⚠️ Error saving {path}: {e}")
         return False
 
+def render_mode() -> str:
+    if RENDER["mode"] is None:
+        plain = (os.environ.get("QUIZ_PLAIN") or os.environ.get("TERM") == "dumb"
+                 or not sys.stdout.isatty())
+        if not plain and os.name == "nt":
+            os.system("")  # one-time call that turns on escape sequence handling in the Windows console
+        RENDER["mode"] = "plain" if plain else "ansi"
+    return RENDER["mode"]
+
+def _reset_prefix() -> str:
+    HUD_CACHE.clear()
+    if render_mode() != "ansi":
+        return "\n"
+    prefix = "\033[r" if RENDER["scroll_region"] else ""
+    RENDER["scroll_region"] = False
+    return prefix + "\033[H\033[2J"
+
 def clear_screen():
-    os.system("cls" if os.name == "nt" else "clear")
+    sys.stdout.write(_reset_prefix())
+    sys.stdout.flush()
+
+def restore_terminal():
+    if RENDER["scroll_region"]:
+        sys.stdout.write("\033[r")
+        sys.stdout.flush()
+        RENDER["scroll_region"] = False
+
+atexit.register(restore_terminal)
+
+def render_screen(lines: list):
+    """Clear the screen and draw lines with a single write."""
+    sys.stdout.write(_reset_prefix() + "\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+def render_hud(lines: list):
+    """Draw a HUD pinned to the top of the screen, rewriting only the rows that changed since the last call.
+
+    Output printed after the HUD scrolls in the region below it. Falls back to a full redraw when the
+    layout changed, the terminal is too small, or escape sequences are unavailable.
+    """
+    if render_mode() != "ansi":
+        render_screen(lines); return
+    rows = shutil.get_terminal_size().lines
+    n = len(lines)
+    if n + 8 > rows:
+        render_screen(lines); return
+    if len(HUD_CACHE) != n:
+        render_screen(lines)
+        RENDER["scroll_region"] = True
+        sys.stdout.write(f"\033[{n + 1};{rows}r\033[{n + 1};1H")
+    else:
+        out = [f"\033[{i};1H\033[2K{line}" for i, (line, old) in enumerate(zip(lines, HUD_CACHE), 1) if line != old]
+        out.append(f"\033[{n + 1};1H\033[J")
+        sys.stdout.write("".join(out))
+    sys.stdout.flush()
+    HUD_CACHE[:] = lines
 
 def press_enter():
+    if INPUT["script"] is not None:
+        return
     try:
         input("\n⚡ Press Enter to continue...")
     except (EOFError, KeyboardInterrupt):
         pass
 
-def safe_input(prompt=""):
+def _next_script_line(prompt: str, secret: bool = False, timed: bool = False) -> Optional[str]:
+    if INPUT["pos"] >= len(INPUT["script"]):
+        raise ScriptExhausted()
+    line = INPUT["script"][INPUT["pos"]]
+    INPUT["pos"] += 1
+    if timed and line == RECORD_TIMEOUT_MARKER:
+        if not INPUT["fast"]:
+            print(prompt)
+        return None
+    if not INPUT["fast"]:
+        print(prompt + ("*" * len(line) if secret else line))
+    return line.strip()
+
+def _record_input(line: str):
+    if INPUT["record"] is not None:
+        INPUT["record"].write(line + "\n")
+        INPUT["record"].flush()
+
+def safe_input(prompt="", secret=False):
+    """Read one line. secret=True marks passwords: they are recorded as RECORD_SECRET_PLACEHOLDER."""
+    if INPUT["script"] is not None:
+        return _next_script_line(prompt, secret)
     try:
-        return input(prompt).strip()
+        line = input(prompt).strip()
     except (EOFError, KeyboardInterrupt):
         print("\n⚠️ Input interrupted")
         return ""
+    _record_input(RECORD_SECRET_PLACEHOLDER if secret else line)
+    return line
+
+def timed_input(prompt: str, timeout: float) -> Optional[str]:
+    """Like safe_input, but returns None if no line arrives within timeout seconds."""
+    if INPUT["script"] is not None:
+        return _next_script_line(prompt, timed=True)
+    deadline = time.perf_counter() + timeout
+    # select() only sees the OS-level fd, so piped input (which Python buffers ahead) is read untimed
+    if os.name == "nt" or not sys.stdin.isatty():
+        ready = True
+    else:
+        print(prompt, end="", flush=True); prompt = ""
+        try:
+            ready, _, _ = select.select([sys.stdin], [], [], max(0.0, timeout))
+        except (OSError, ValueError):
+            ready = True
+        except KeyboardInterrupt:
+            print("\n⚠️ Input interrupted"); return ""
+        if not ready:
+            if termios is not None:
+                termios.tcflush(sys.stdin, termios.TCIFLUSH)  # drop a half-typed answer so it can't leak into the next prompt
+            print()
+    if ready:
+        try:
+            line = input(prompt).strip()
+        except (EOFError, KeyboardInterrupt):
+            print("\n⚠️ Input interrupted"); return ""
+        if time.perf_counter() < deadline:
+            _record_input(line)
+            return line
+    _record_input(RECORD_TIMEOUT_MARKER)
+    return None
 
 def get_valid_choice(prompt, valid_choices, error_msg="⚠️ Invalid choice."):
     while True:
@@ -101,6 +348,60 @@ def _find_record_case_insensitive(d: dict, key: str):
             return k, v
     return None, None
 
+def lru_get(store: OrderedDict, key, ttl: float, now: float, stats: Optional[dict] = None):
+    """Return the value cached under key, or None if absent or older than ttl seconds.
+
+    Entries dropped for age are counted in stats["expirations"] when stats is given.
+    """
+    entry = store.get(key)
+    if entry is None:
+        return None
+    if now - entry[0] > ttl:
+        del store[key]
+        if stats is not None:
+            stats["expirations"] += 1
+        return None
+    store.move_to_end(key)
+    return entry[1]
+
+def lru_put(store: OrderedDict, key, value, max_entries: int, now: float) -> int:
+    """Store value under key as most recently used; returns how many old entries were evicted."""
+    store[key] = (now, value)
+    store.move_to_end(key)
+    evicted = 0
+    while len(store) > max_entries:
+        store.popitem(last=False)
+        evicted += 1
+    return evicted
+
+def _take_token(scope: str, ident: str, now: float) -> float:
+    """Spend one token from the (scope, ident) bucket. Returns 0 if allowed, else seconds until a token is available."""
+    capacity, rate = RATE_LIMITS[scope]
+    bucket = lru_get(RATE_BUCKETS, (scope, ident), RATE_LIMIT_TTL, now)
+    if bucket is None:
+        bucket = [float(capacity), now]
+    else:
+        bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+    lru_put(RATE_BUCKETS, (scope, ident), bucket, RATE_LIMIT_MAX_ENTRIES, now)
+    if bucket[0] < 1:
+        return (1 - bucket[0]) / rate
+    bucket[0] -= 1
+    return 0.0
+
+def check_rate_limit(username: str) -> bool:
+    """Charge one attempt to this connection and username. Prints a lockout notice and returns False when exhausted."""
+    now = time.monotonic()
+    wait = _take_token("conn", CONNECTION["id"], now) or _take_token("user", username.casefold(), now)
+    if wait:
+        print(f"⏳ Too many attempts. Try again in {int(wait) + 1} seconds.")
+        press_enter()
+        return False
+    return True
+
+def clear_rate_limit(username: str):
+    RATE_BUCKETS.pop(("user", username.casefold()), None)
+
 def hash_password(password: str, salt: Optional[bytes] = None) -> dict:
     if salt is None:
         salt = os.urandom(16)
@@ -143,7 +444,20 @@ def normalize_player(p: Optional[dict]) -> dict:
             except Exception:
                 new_inv[k] = 0
     player["inventory"] = new_inv
-    player["shield_active"] = bool(player.get("shield_active", False))
+    effects = player.get("effects", {}) or {}
+    if not isinstance(effects, dict):
+        effects = {}
+    new_effects = {}
+    for k, v in effects.items():
+        try:
+            amount, turns = int(v[0]), int(v[1])
+        except Exception:
+            continue
+        if isinstance(k, str) and amount > 0 and turns >= 0 and not (k in TICK_HANDLERS and turns == 0):
+            new_effects[k] = [amount, turns]
+    if p.get("shield_active") and "shield" not in new_effects:
+        new_effects["shield"] = [1, 0]
+    player["effects"] = new_effects
     if not isinstance(player.get("name"), str) or not player["name"].strip():
         player["name"] = DEFAULT_PLAYER["name"]
     return player
@@ -209,15 +523,221 @@ def update_leaderboard_with_player(player: dict):
     })
     LEADERBOARD.sort(key=lambda x: x.get("score", 0), reverse=True)
     del LEADERBOARD[10:]
-    return save_leaderboard()
+    saved = save_leaderboard()
+    return flush_score_events() and saved
+
+def window_key(kind: str, ts: float) -> str:
+    """Key of the window containing ts (UTC). Keys of one kind sort chronologically."""
+    t = time.gmtime(ts)
+    if kind == "daily":
+        return time.strftime("%Y-%m-%d", t)
+    if kind == "weekly":
+        return time.strftime("%G-W%V", t)
+    return f"{t.tm_year}-S{(t.tm_mon - 1) // 3 + 1}"
+
+def window_board_path(kind: str) -> str:
+    return os.path.join(LEADERBOARD_DIR, f"{kind}.json")
+
+def window_log_path(kind: str) -> str:
+    return os.path.join(LEADERBOARD_DIR, f"{kind}.log")
+
+def _replace_file(path: str, text: str):
+    """Atomically replace path with text so other processes never read a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+@contextmanager
+def window_lock(kind: str):
+    """Hold the exclusive writer lock for kind's snapshot and journal."""
+    os.makedirs(LEADERBOARD_DIR, exist_ok=True)
+    with open(os.path.join(LEADERBOARD_DIR, f"{kind}.lock"), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)  # released when f is closed
+        yield
+
+def _log_identity(kind: str):
+    try:
+        st = os.stat(window_log_path(kind))
+    except OSError:
+        return None, 0
+    return (st.st_dev, st.st_ino), st.st_size
+
+def _apply_log_lines(board: dict, data: bytes) -> int:
+    """Apply complete journal lines from data; returns the number of bytes consumed."""
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].splitlines():
+        try:
+            gen, name, points = json.loads(line)
+            if gen == board["gen"] and int(points) > 0:
+                apply_score_event(board, str(name), int(points))
+        except Exception:
+            continue
+    return end
+
+def load_window_board(kind: str) -> dict:
+    """Read a board from its snapshot plus its whole journal."""
+    data = safe_json_load(window_board_path(kind))
+    scores = {}
+    key, gen = None, 0
+    if isinstance(data, dict) and isinstance(data.get("scores"), dict):
+        key = data.get("key") if isinstance(data.get("key"), str) else None
+        gen = data.get("gen", 0) if isinstance(data.get("gen"), int) else 0
+        for name, pts in data["scores"].items():
+            try:
+                if int(pts) > 0:
+                    scores[str(name)] = int(pts)
+            except Exception:
+                continue
+    # heap is a min-heap of (-points, name), i.e. best first. A score update pushes a new entry in O(log n)
+    # and leaves the old one stale; board_top skips stale entries and apply_score_event rebuilds the heap
+    # once they outnumber the live ones.
+    heap = [(-pts, name) for name, pts in scores.items()]
+    heapq.heapify(heap)
+    board = {"kind": kind, "key": key, "gen": gen, "scores": scores, "total": sum(scores.values()),
+             "heap": heap, "log_id": None, "log_offset": 0}
+    board["log_id"], _ = _log_identity(kind)
+    try:
+        with open(window_log_path(kind), "rb") as f:
+            board["log_offset"] = _apply_log_lines(board, f.read())
+    except OSError:
+        pass
+    return board
+
+def window_board(kind: str) -> dict:
+    """The in-memory board for kind, caught up with journal lines appended since the last call."""
+    board = WINDOW_BOARDS.get(kind)
+    log_id, size = _log_identity(kind)
+    if board is None or board["log_id"] != log_id or size < board["log_offset"]:
+        board = WINDOW_BOARDS[kind] = load_window_board(kind)
+    elif size > board["log_offset"]:
+        with open(window_log_path(kind), "rb") as f:
+            f.seek(board["log_offset"])
+            board["log_offset"] += _apply_log_lines(board, f.read())
+    return board
+
+def save_window_snapshot(board: dict, key: str, scores: dict) -> bool:
+    """Start a new snapshot generation for the board and an empty journal. Call with window_lock held
+    and the board caught up, so no journal line is dropped."""
+    try:
+        _replace_file(window_board_path(board["kind"]), json.dumps(
+            {"kind": board["kind"], "key": key, "gen": board["gen"] + 1, "scores": scores},
+            ensure_ascii=False, separators=(",", ":")))
+        _replace_file(window_log_path(board["kind"]), "")
+    except Exception as e:
+        print(f"⚠️ Error saving {window_board_path(board['kind'])}: {e}")
+        return False
+    WINDOW_BOARDS.pop(board["kind"], None)
+    return True
+
+def archive_window_board(board: dict) -> bool:
+    """Write the finished window's rollup as a compact read-only file."""
+    path = os.path.join(LEADERBOARD_DIR, "archive", f"{board['kind']}-{board['key']}.json")
+    if os.path.exists(path):
+        return True
+    rollup = {"kind": board["kind"], "key": board["key"], "players": len(board["scores"]), "total": board["total"],
+              "top": [list(e) for e in board_top(board, WINDOW_ARCHIVE_TOP)]}
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rollup, f, ensure_ascii=False, separators=(",", ":"))
+        os.chmod(path, 0o444)
+        return True
+    except Exception as e:
+        print(f"⚠️ Error saving {path}: {e}")
+        return False
+
+def rotate_window_board(board: dict, key: str) -> dict:
+    if board["key"] and board["scores"]:
+        archive_window_board(board)
+    save_window_snapshot(board, key, {})
+    return window_board(board["kind"])
+
+def reset_window_board(kind: str) -> bool:
+    """Empty kind's board for the current window. Unlike rotation, nothing is archived."""
+    try:
+        with window_lock(kind):
+            return save_window_snapshot(window_board(kind), window_key(kind, time.time()), {})
+    except Exception as e:
+        print(f"⚠️ Error updating {LEADERBOARD_DIR}: {e}")
+        return False
+
+def apply_score_event(board: dict, name: str, points: int):
+    scores = board["scores"]
+    scores[name] = scores.get(name, 0) + points
+    heapq.heappush(board["heap"], (-scores[name], name))
+    board["total"] += points
+    if len(board["heap"]) > 2 * len(scores) + 64:
+        board["heap"] = [(-pts, n) for n, pts in scores.items()]
+        heapq.heapify(board["heap"])  # amortized O(1) per event
+
+def board_top(board: dict, n: int) -> list:
+    """The board's best n players as (name, points), best first."""
+    heap, scores = board["heap"], board["scores"]
+    stale = len(heap) - len(scores)
+    return [(name, -neg) for neg, name in heapq.nsmallest(n + stale, heap) if scores.get(name) == -neg][:n]
+
+def post_score_event(name: str, points: int):
+    if points > 0:
+        PENDING_SCORE_EVENTS.append((time.time(), name, points))
+
+def _append_log(board: dict, lines: list):
+    with open(window_log_path(board["kind"]), "a", encoding="utf-8") as f:
+        f.write("".join(lines))
+
+def flush_score_events() -> bool:
+    """Append buffered score events to every window's journal, rotating boards whose window has passed.
+
+    Each event costs one O(log n) heap push per board; files are only appended to, except on rotation and
+    when a journal outgrows WINDOW_LOG_COMPACT_BYTES.
+    """
+    if not PENDING_SCORE_EVENTS:
+        return True
+    ok = True
+    try:
+        for kind in LEADERBOARD_WINDOWS:
+            with window_lock(kind):
+                board = window_board(kind)
+                lines = []
+                for ts, name, points in PENDING_SCORE_EVENTS:
+                    key = window_key(kind, ts)
+                    if board["key"] is not None and key < board["key"]:
+                        continue  # late event for a window that was already rotated
+                    if board["key"] != key:
+                        if lines:
+                            _append_log(board, lines); lines = []
+                            board = window_board(kind)
+                        board = rotate_window_board(board, key)
+                    lines.append(json.dumps([board["gen"], name, points], ensure_ascii=False) + "\n")
+                if lines:
+                    _append_log(board, lines)
+                board = window_board(kind)
+                if board["log_offset"] > WINDOW_LOG_COMPACT_BYTES:
+                    save_window_snapshot(board, board["key"], board["scores"])
+    except Exception as e:
+        print(f"⚠️ Error updating {LEADERBOARD_DIR}: {e}")
+        ok = False
+    PENDING_SCORE_EVENTS.clear()
+    return ok
+
+def archived_windows(kind: str) -> list:
+    """Archived window keys of the given kind, newest first."""
+    try:
+        names = os.listdir(os.path.join(LEADERBOARD_DIR, "archive"))
+    except OSError:
+        return []
+    prefix = f"{kind}-"
+    return sorted((n[len(prefix):-len(".json")] for n in names if n.startswith(prefix) and n.endswith(".json")), reverse=True)
 
 def load_questions():
     global QUESTIONS
     data = safe_json_load(QUESTION_FILE)
     if not isinstance(data, list):
         sample = [
-            {"question":"What is 2 + 2?","options":["3","4","5","6"],"answer":"4","difficulty":"easy"},
-            {"question":"What is the capital of France?","options":["London","Berlin","Paris","Madrid"],"answer":"Paris","difficulty":"medium"},
+            {"question":"What is 2 + 2?","options":["3","4","5","6"],"answer":"4","difficulty":"easy","category":"math"},
+            {"question":"What is the capital of France?","options":["London","Berlin","Paris","Madrid"],"answer":"Paris","difficulty":"medium","category":"geography"},
         ]
         safe_json_write(QUESTION_FILE, sample)
         QUESTIONS = sample
@@ -236,7 +756,8 @@ def load_questions():
         diff = q.get("difficulty","medium").lower()
         if diff not in ("easy","medium","hard","boss"):
             diff = "medium"
-        valid.append({"question": question, "options": options, "answer": answer, "difficulty": diff})
+        category = str(q.get("category") or "general").strip().lower() or "general"
+        valid.append({"question": question, "options": options, "answer": answer, "difficulty": diff, "category": category})
     if not valid:
         print("⚠️ No valid questions found. Creating sample questions.")
         load_questions()
@@ -244,22 +765,183 @@ def load_questions():
         QUESTIONS = valid
     return QUESTIONS
 
+def build_question_bank(questions: list, source_mtime: int) -> bool:
+    """Write questions to QUESTION_BANK_FILE grouped by category and difficulty so each pool is a contiguous record range."""
+    ordered = sorted(questions, key=lambda q: (q["category"], q["difficulty"]))
+    records = [json.dumps(q, ensure_ascii=False, separators=(",", ":")).encode("utf-8") for q in ordered]
+    pools = {}
+    for i, q in enumerate(ordered):
+        pool = pools.setdefault(q["category"], {}).setdefault(q["difficulty"], [i, 0])
+        pool[1] += 1
+    index = json.dumps(pools, separators=(",", ":")).encode("utf-8")
+    offset = BANK_HEADER.size + len(index) + 4 + BANK_ENTRY.size * len(records)
+    table = []
+    for r in records:
+        table.append(BANK_ENTRY.pack(offset, len(r)))
+        offset += len(r)
+    tmp = QUESTION_BANK_FILE + f".{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(BANK_HEADER.pack(BANK_MAGIC, 1, source_mtime, len(index)))
+            f.write(index)
+            f.write(struct.pack("<I", len(records)))
+            f.write(b"".join(table))
+            f.write(b"".join(records))
+        os.replace(tmp, QUESTION_BANK_FILE)  # atomic, so other workers never map a half-written bank
+        return True
+    except Exception as e:
+        print(f"⚠️ Error saving {QUESTION_BANK_FILE}: {e}")
+        return False
+
+def _map_question_bank():
+    try:
+        with open(QUESTION_BANK_FILE, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, version, source_mtime, index_len = BANK_HEADER.unpack_from(mm, 0)
+        if magic != BANK_MAGIC or version != 1:
+            raise ValueError("bad header")
+        pools = json.loads(mm[BANK_HEADER.size:BANK_HEADER.size + index_len])
+        table = BANK_HEADER.size + index_len
+        count = struct.unpack_from("<I", mm, table)[0]
+    except Exception:
+        mm.close()
+        return None
+    return {"mm": mm, "source_mtime": source_mtime, "pools": pools, "table": table + 4, "count": count}
+
+def open_question_bank() -> dict:
+    """Map the shared question bank, rebuilding it first if questions.json changed since it was built."""
+    try:
+        source_mtime = os.stat(QUESTION_FILE).st_mtime_ns
+    except OSError:
+        source_mtime = None
+    if BANK["mm"] is not None and BANK["source_mtime"] == source_mtime:
+        return BANK
+    bank = _map_question_bank()
+    if bank is None or source_mtime is None or bank["source_mtime"] != source_mtime:
+        if bank is not None:
+            bank["mm"].close()
+        questions = load_questions()
+        build_question_bank(questions, os.stat(QUESTION_FILE).st_mtime_ns if os.path.exists(QUESTION_FILE) else 0)
+        bank = _map_question_bank()
+        if bank is None:
+            raise RuntimeError(f"could not open {QUESTION_BANK_FILE}")
+    if BANK["mm"] is not None:
+        BANK["mm"].close()
+    BANK.update(bank)
+    return BANK
+
+def bank_categories() -> list:
+    return sorted(BANK["pools"].keys())
+
+def bank_pool(category: Optional[str], difficulties) -> list:
+    """Record numbers of the questions in category (None = every category) with one of the given difficulties."""
+    refs = []
+    for cat, pools in BANK["pools"].items():
+        if category is not None and cat != category:
+            continue
+        for d in difficulties:
+            if d in pools:
+                first, count = pools[d]
+                refs.extend(range(first, first + count))
+    return refs
+
+def bank_question(ref: int) -> dict:
+    if not 0 <= ref < BANK["count"]:
+        raise IndexError(f"question record {ref} is not in {QUESTION_BANK_FILE} ({BANK['count']} records)")
+    offset, length = BANK_ENTRY.unpack_from(BANK["mm"], BANK["table"] + ref * BANK_ENTRY.size)
+    return json.loads(BANK["mm"][offset:offset + length])
+
+def _validate_items(data) -> dict:
+    valid = {}
+    if not isinstance(data, dict):
+        return valid
+    for key, it in data.items():
+        if not isinstance(key, str) or not isinstance(it, dict):
+            continue
+        name = str(it.get("name", "")).strip()
+        effects = it.get("effects")
+        if not name or not isinstance(effects, list) or not effects:
+            continue
+        specs = []
+        for e in effects:
+            if not isinstance(e, dict) or e.get("type") not in EFFECT_HANDLERS:
+                specs = []; break
+            try:
+                spec = {"type": e["type"], "amount": max(1, int(e.get("amount", 1))), "turns": max(0, int(e.get("turns", 0)))}
+            except Exception:
+                specs = []; break
+            if spec["type"] in TICK_HANDLERS and spec["turns"] < 1:
+                specs = []; break  # per-turn effects must expire, turns == 0 would make them permanent
+            specs.append(spec)
+        if not specs:
+            continue
+        try:
+            price = max(0, int(it.get("price", 0)))
+            drop_weight = max(0.0, float(it.get("drop_weight", 1)))
+        except Exception:
+            continue
+        valid[key] = {"name": name, "desc": str(it.get("desc", "")), "price": price,
+                      "drop_weight": drop_weight, "effects": specs}
+    return valid
+
+def load_items():
+    global ITEMS, ITEM_KEYS, ITEM_DROP_WEIGHTS
+    valid = _validate_items(safe_json_load(ITEMS_FILE))
+    if not valid:
+        print("⚠️ No valid items found. Creating default items.")
+        safe_json_write(ITEMS_FILE, DEFAULT_ITEMS)
+        valid = _validate_items(DEFAULT_ITEMS)
+    ITEMS = valid
+    ITEM_KEYS = list(valid.keys())
+    ITEM_DROP_WEIGHTS = [it["drop_weight"] for it in valid.values()]
+    return ITEMS
+
 def player_save_path(username: str) -> str:
     safe_username = re.sub(r'[<>:"/\\|?*]', '_', username)
     return os.path.join(SAVE_DIR, f"{safe_username}.json")
 
+def gauntlet_checkpoint_path(username: str) -> str:
+    return player_save_path(username)[:-len(".json")] + ".gauntlet.json"
+
+def _save_mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
 def load_player(username: str) -> dict:
+    """Return a fresh copy of the player, served from PLAYER_CACHE unless the save file changed on disk."""
     ensure_dirs()
-    data = safe_json_load(player_save_path(username))
-    if not data:
-        return normalize_player({"name": username})
-    return normalize_player(data)
+    path = player_save_path(username)
+    key = username.casefold()
+    mtime = _save_mtime(path)
+    now = time.monotonic()
+    cached = lru_get(PLAYER_CACHE, key, PLAYER_CACHE_TTL, now, PLAYER_CACHE_STATS)
+    if cached is not None and cached[0] == mtime:
+        PLAYER_CACHE_STATS["hits"] += 1
+        return copy.deepcopy(cached[1])
+    PLAYER_CACHE_STATS["misses"] += 1
+    data = safe_json_load(path)
+    player = normalize_player(data if data else {"name": username})
+    PLAYER_CACHE_STATS["evictions"] += lru_put(PLAYER_CACHE, key, (mtime, player), PLAYER_CACHE_MAX_ENTRIES, now)
+    return copy.deepcopy(player)
 
 def save_player(username: str, player: dict) -> bool:
     if not isinstance(player, dict):
         print("⚠️ Invalid player data")
         return False
-    return safe_json_write(player_save_path(username), normalize_player(player))
+    key, path = username.casefold(), player_save_path(username)
+    PLAYER_CACHE.pop(key, None)
+    normalized = normalize_player(player)
+    if not safe_json_write(path, normalized):
+        return False
+    # cache what was just written, so logging back in is a hit until the file changes elsewhere
+    now = time.monotonic()
+    PLAYER_CACHE_STATS["evictions"] += lru_put(PLAYER_CACHE, key, (_save_mtime(path), normalized), PLAYER_CACHE_MAX_ENTRIES, now)
+    return True
 
 def health_bar(current, maximum, length=20):
     try:
@@ -285,10 +967,10 @@ def register_user():
     if any(u.lower() == username.lower() for u in USERS.keys()):
         print("⚠️ Username already exists.")
         press_enter(); return None
-    pw = safe_input("Choose a password (minimum 4 characters): ")
+    pw = safe_input("Choose a password (minimum 4 characters): ", secret=True)
     if len(pw) < 4:
         print("⚠️ Password too short."); press_enter(); return None
-    confirm = safe_input("Confirm password: ")
+    confirm = safe_input("Confirm password: ", secret=True)
     if pw != confirm:
         print("⚠️ Passwords do not match."); press_enter(); return None
     if os.path.exists(player_save_path(username)):
@@ -303,20 +985,22 @@ def register_user():
     return username
 
 def login_account(is_admin=False):
+    role = "Admin" if is_admin else "User"
+    username = safe_input(f"{role} username: ").strip()
+    pw = safe_input("Password: ", secret=True).strip()
+    if not username or not pw:
+        print("⚠️ Username and password cannot be empty."); press_enter(); return None
+    if not check_rate_limit(f"{role}:{username}"):
+        return None
     if is_admin:
         load_admins()
         db = ADMINS
-        role = "Admin"
     else:
         load_users()
         db = USERS
-        role = "User"
-    username = safe_input(f"{role} username: ").strip()
-    pw = safe_input("Password: ").strip()
-    if not username or not pw:
-        print("⚠️ Username and password cannot be empty."); press_enter(); return None
     key, stored = _find_record_case_insensitive(db, username)
     if stored and isinstance(stored, dict) and verify_password(pw, stored):
+        clear_rate_limit(f"{role}:{username}")
         print(f"✅ {role} logged in as {key if key else username}")
         press_enter()
         return key if not is_admin else True
@@ -325,55 +1009,116 @@ def login_account(is_admin=False):
     return None
 
 def reset_password():
-    load_users()
     username = safe_input("Enter your username: ").strip()
     if not username:
         print("⚠️ Username cannot be empty."); press_enter(); return None
+    old_pw = safe_input("Enter your CURRENT password: ", secret=True).strip()
+    if not old_pw:
+        print("⚠️ Password cannot be empty."); press_enter(); return None
+    if not check_rate_limit(f"User:{username}"):
+        return None
+    load_users()
     key, stored = _find_record_case_insensitive(USERS, username)
-    if not key:
-        print("⚠️ Username not found."); press_enter(); return None
-    new_pw = safe_input("Enter a NEW password (minimum 4 characters): ").strip()
+    if not key or not isinstance(stored, dict) or not verify_password(old_pw, stored):
+        print("⚠️ Invalid credentials."); press_enter(); return None
+    new_pw = safe_input("Enter a NEW password (minimum 4 characters): ", secret=True).strip()
     if len(new_pw) < 4:
         print("⚠️ Password must be at least 4 characters long."); press_enter(); return None
-    confirm = safe_input("Confirm NEW password: ").strip()
+    confirm = safe_input("Confirm NEW password: ", secret=True).strip()
     if new_pw != confirm:
         print("⚠️ Passwords do not match."); press_enter(); return None
     USERS[key] = hash_password(new_pw)
     if save_users():
-        print("✅ Password reset successful!"); press_enter(); return key
+        clear_rate_limit(f"User:{username}")
+        print("✅ Password changed successfully!"); press_enter(); return key
     print("⚠️ Failed to save password change."); press_enter(); return None
 
-def ask_question(q: dict) -> bool:
+def ask_question(q: dict, time_limit: Optional[float] = None) -> tuple:
+    """Ask q and return (correct, elapsed_seconds). With time_limit, running out of time counts as wrong."""
     opts = q.get("options", [])
     ans = q.get("answer")
     question_text = q.get("question", "???")
     if not ans or not opts or ans not in opts:
-        print("⚠️ Invalid question data."); return False
+        print("⚠️ Invalid question data."); return False, 0.0
     print(f"\n❓ {question_text}")
     for i, o in enumerate(opts, 1):
         print(f"   {i}. {o}")
     if DEV_MODE["show_answers"]:
         print(f"💡 [Answer: {ans}]")
+    if time_limit:
+        print(f"⏱️ You have {time_limit:g} seconds!")
     opts_norm = [o.lower().strip() for o in opts]
     ans_norm = ans.lower().strip()
+    start = time.perf_counter()
+    result = None
     for attempt in range(3):
-        user_input = safe_input(f"👉 Your answer (attempt {attempt+1}/3): ")
+        prompt = f"👉 Your answer (attempt {attempt+1}/3): "
+        if time_limit:
+            user_input = timed_input(prompt, time_limit - (time.perf_counter() - start))
+            # the untimed fallback read (Windows, piped stdin) can return after the deadline
+            if user_input is None or time.perf_counter() - start >= time_limit:
+                print(f"⏰ Time's up! The correct answer was: {ans}")
+                result = False; break
+        else:
+            user_input = safe_input(prompt)
         if not user_input:
             print("⚠️ Please enter an answer."); continue
         if user_input.isdigit():
             idx = int(user_input) - 1
             if 0 <= idx < len(opts):
-                return opts[idx] == ans
+                result = opts[idx] == ans; break
             print(f"⚠️ Enter a number between 1 and {len(opts)}."); continue
         u = user_input.lower().strip()
         if u == ans_norm:
-            return True
-        for i, on in enumerate(opts_norm):
-            if u == on:
-                return opts[i] == ans
+            result = True; break
+        if u in opts_norm:
+            result = opts[opts_norm.index(u)] == ans; break
         print("⚠️ Invalid input. Use an option number or exact option text.")
-    print(f"⚠️ Max attempts. The correct answer was: {ans}")
-    return False
+    elapsed = time.perf_counter() - start
+    if result is None:
+        print(f"⚠️ Max attempts. The correct answer was: {ans}")
+        result = False
+    if INPUT["script"] is None:
+        record_response_time(q, elapsed)  # scripted answer times would skew the latency data
+    return result, elapsed
+
+def speed_bonus(elapsed: float, time_limit: Optional[float]) -> int:
+    """0-5 bonus for answering early in timed mode."""
+    if not time_limit or elapsed >= time_limit:
+        return 0
+    return int(5 * (1 - elapsed / time_limit) + 0.5)
+
+def record_response_time(q: dict, elapsed: float):
+    key = q.get("question", "???")
+    rec = RESPONSE_TIMES.get(key)
+    if rec is None:
+        rec = RESPONSE_TIMES[key] = {"difficulty": q.get("difficulty", "medium"), "count": 0, "total": 0.0,
+                                     "buckets": [0] * (len(RESPONSE_TIME_BUCKETS) + 1)}
+    i = 0
+    while i < len(RESPONSE_TIME_BUCKETS) and elapsed > RESPONSE_TIME_BUCKETS[i]:
+        i += 1
+    rec["buckets"][i] += 1
+    rec["count"] += 1
+    rec["total"] = round(rec["total"] + elapsed, 3)
+
+def load_response_times():
+    global RESPONSE_TIMES
+    data = safe_json_load(RESPONSE_TIMES_FILE)
+    RESPONSE_TIMES = {}
+    if isinstance(data, dict):
+        for k, rec in data.items():
+            try:
+                buckets = [max(0, int(b)) for b in rec["buckets"]]
+                if len(buckets) != len(RESPONSE_TIME_BUCKETS) + 1:
+                    continue
+                RESPONSE_TIMES[k] = {"difficulty": str(rec.get("difficulty", "medium")), "count": sum(buckets),
+                                     "total": max(0.0, float(rec.get("total", 0))), "buckets": buckets}
+            except Exception:
+                continue
+    return RESPONSE_TIMES
+
+def save_response_times():
+    return safe_json_write(RESPONSE_TIMES_FILE, RESPONSE_TIMES)
 
 def get_xp_required(level: int) -> int:
     try:
@@ -389,13 +1134,13 @@ def get_xp_required(level: int) -> int:
     except Exception:
         return 1000
 
-def check_level_up(player: dict) -> bool:
-    leveled = False
+def check_level_up(player: dict) -> list:
+    """Level up as often as XP allows. Returns the stat chosen at each new level ("max_hp", "damage" or "gold_bonus")."""
+    upgrades = []
     while player["xp"] >= get_xp_required(player["level"]):
         req = get_xp_required(player["level"])
         player["xp"] -= req
         player["level"] += 1
-        leveled = True
         clear_screen()
         print(f"\n🎉 {player['name']} leveled up! Now Level {player['level']}")
         print(f"📈 Next level requires: {get_xp_required(player['level'])} XP")
@@ -406,13 +1151,13 @@ def check_level_up(player: dict) -> bool:
             print("3) 💰 +2 Gold per victory bonus")
             choice = safe_input("👉 Choose (1, 2, or 3): ")
             if choice == "1":
-                player["max_hp"] += 15
+                player["max_hp"] += 15; upgrades.append("max_hp")
                 print("🛡️ Max HP increased by 15!"); break
             if choice == "2":
-                player["damage"] += 3
+                player["damage"] += 3; upgrades.append("damage")
                 print("⚔️ Damage increased by 3!"); break
             if choice == "3":
-                player["gold_bonus"] = player.get("gold_bonus", 0) + 2
+                player["gold_bonus"] = player.get("gold_bonus", 0) + 2; upgrades.append("gold_bonus")
                 print("💰 Gold bonus increased by 2 per victory!"); break
             print("⚠️ Please enter 1, 2, or 3.")
         old_hp = player["hp"]
@@ -420,7 +1165,7 @@ def check_level_up(player: dict) -> bool:
         if player["hp"] > old_hp:
             print(f"❤️ Restored {player['hp'] - old_hp} HP! Now at full health.")
         press_enter()
-    return leveled
+    return upgrades
 
 def get_level_scaling_factor(player_level: int) -> float:
     if player_level <= 1:
@@ -444,19 +1189,22 @@ def get_enemy_name_variant(base_name: str, player_level: int) -> str:
     idx = min(len(lst)-1, (player_level-1)//1 if player_level<=10 else 8 + (player_level-10)//3)
     return lst[idx]
 
-def make_enemy(diff: str, player_level: int=1) -> dict:
-    base = {
-        "easy": {"name":"Slime","hp":35,"damage":6,"xp_reward":10,"gold_base":25},
-        "medium": {"name":"Goblin","hp":60,"damage":10,"xp_reward":20,"gold_base":40},
-        "hard": {"name":"Orc","hp":90,"damage":16,"xp_reward":35,"gold_base":65},
-        "boss": {"name":"Dragon","hp":150,"damage":25,"xp_reward":75,"gold_base":120},
-    }.get(diff, {"name":"Goblin","hp":60,"damage":10,"xp_reward":20,"gold_base":40})
+ENEMY_BASES = {
+    "easy": {"name":"Slime","hp":35,"damage":6,"xp_reward":10,"gold_base":25},
+    "medium": {"name":"Goblin","hp":60,"damage":10,"xp_reward":20,"gold_base":40},
+    "hard": {"name":"Orc","hp":90,"damage":16,"xp_reward":35,"gold_base":65},
+    "boss": {"name":"Dragon","hp":150,"damage":25,"xp_reward":75,"gold_base":120},
+}
+
+def make_enemy(diff: str, player_level: int=1, rng=None) -> dict:
+    base = ENEMY_BASES.get(diff, ENEMY_BASES["medium"])
     f = get_level_scaling_factor(player_level)
-    v = random.uniform(0.9, 1.1)
+    v = (rng or random).uniform(0.9, 1.1)
     hp = max(int(base["hp"] * f * v), base["hp"])
     dmg = max(int(base["damage"] * f * v), base["damage"])
     return {
         "name": get_enemy_name_variant(base["name"], player_level),
+        "level": player_level,
         "hp": hp,
         "max_hp": hp,
         "damage": dmg,
@@ -464,15 +1212,34 @@ def make_enemy(diff: str, player_level: int=1) -> dict:
         "gold_base": int(base["gold_base"] * (1 + (player_level - 1) * 0.15))
     }
 
+def simulate_enemy_stats(diff: str, player_level: int, n: int, seed: int) -> dict:
+    """Min/mean/max hp and damage over n randomly rolled enemies, drawn in vectorized blocks."""
+    base = ENEMY_BASES.get(diff, ENEMY_BASES["medium"])
+    f = get_level_scaling_factor(player_level)
+    stats = {"hp": [None, 0, None], "damage": [None, 0, None]}
+    for block in random_blocks(seed, n):
+        for key, st in stats.items():
+            if np is not None:
+                vals = np.maximum((base[key] * f * (0.9 + 0.2 * block)).astype(int), base[key])
+                lo, total, hi = int(vals.min()), int(vals.sum()), int(vals.max())
+            else:
+                vals = [max(int(base[key] * f * (0.9 + 0.2 * u)), base[key]) for u in block]
+                lo, total, hi = min(vals), sum(vals), max(vals)
+            st[0] = lo if st[0] is None else min(st[0], lo)
+            st[1] += total
+            st[2] = hi if st[2] is None else max(st[2], hi)
+    return {k: {"min": st[0], "mean": st[1] / max(1, n), "max": st[2]} for k, st in stats.items()}
+
 def get_item_drop_chance(difficulty: str, player_level: int) -> float:
     base = {"easy":0.15,"medium":0.2,"hard":0.25,"boss":0.4}.get(difficulty,0.2)
     level_bonus = min(0.2, player_level * 0.02)
     return base + level_bonus
 
-def apply_victory_rewards(player: dict, enemy: dict, diff: str):
+def apply_victory_rewards(player: dict, enemy: dict, diff: str, rng=None):
+    rng = rng or random
     xp_reward = enemy.get("xp_reward", 10)
     player["xp"] += xp_reward
-    base_gold = enemy.get("gold_base", random.randint(30,100))
+    base_gold = enemy.get("gold_base", rng.randint(30,100))
     level_bonus = player["level"] * 3
     gb = player.get("gold_bonus", 0)
     total_gold = base_gold + level_bonus + gb
@@ -482,8 +1249,8 @@ def apply_victory_rewards(player: dict, enemy: dict, diff: str):
         print(f"💰 Gold +{base_gold} + {level_bonus} (level) + {gb} (bonus) = {total_gold}")
     else:
         print(f"💰 Gold +{base_gold} + {level_bonus} (level bonus) = {total_gold}")
-    if random.random() < get_item_drop_chance(diff, player["level"]):
-        item_key = random.choice(list(ITEMS.keys()))
+    if ITEM_KEYS and any(ITEM_DROP_WEIGHTS) and rng.random() < get_item_drop_chance(diff, player["level"]):
+        item_key = rng.choices(ITEM_KEYS, weights=ITEM_DROP_WEIGHTS)[0]
         add_item(player, item_key)
         print(f"🎁 You found a {ITEMS[item_key]['name']}!")
 
@@ -497,24 +1264,86 @@ def add_item(player: dict, item_key: str, qty: int=1) -> bool:
     except Exception:
         return False
 
+def _effect_heal(player: dict, spec: dict) -> str:
+    old = player["hp"]
+    player["hp"] = min(player["max_hp"], player["hp"] + spec["amount"])
+    return f"❤️ Restored {player['hp'] - old} HP."
+
+def _effect_stack(player: dict, spec: dict) -> str:
+    effects = player.setdefault("effects", {})
+    cur = effects.get(spec["type"], [0, 0])
+    effects[spec["type"]] = [cur[0] + spec["amount"], max(cur[1], spec["turns"])]
+    amount, turns = effects[spec["type"]]
+    label = {"shield": "🛡️ Shield", "buff_damage": "⚔️ Damage buff", "dot": "☠️ Poison", "regen": "💚 Regeneration"}.get(spec["type"], spec["type"])
+    return f"{label} active ({amount}{f', {turns} turns' if turns else ''})."
+
+def _tick_dot(player: dict, enemy: dict, amount: int) -> str:
+    enemy["hp"] = max(0, enemy["hp"] - amount)
+    return f"☠️ Poison deals {amount} damage to {enemy['name']}."
+
+def _tick_regen(player: dict, enemy: dict, amount: int) -> str:
+    old = player["hp"]
+    player["hp"] = min(player["max_hp"], player["hp"] + amount)
+    return f"💚 Regenerated {player['hp'] - old} HP."
+
+# effect type -> handler applied when the item is used
+EFFECT_HANDLERS = {
+    "heal": _effect_heal,
+    "shield": _effect_stack,
+    "buff_damage": _effect_stack,
+    "dot": _effect_stack,
+    "regen": _effect_stack,
+}
+
+# effect type -> handler applied once per battle turn while the effect is active
+TICK_HANDLERS = {
+    "dot": _tick_dot,
+    "regen": _tick_regen,
+}
+
+def effect_amount(player: dict, effect_type: str) -> int:
+    e = player.get("effects", {}).get(effect_type)
+    return e[0] if e else 0
+
+def absorb_hit(player: dict) -> bool:
+    """Consume one shield charge if any. Returns True when the hit was blocked."""
+    effects = player.setdefault("effects", {})
+    e = effects.get("shield")
+    if not e:
+        return False
+    e[0] -= 1
+    if e[0] <= 0:
+        del effects["shield"]
+    return True
+
+def resolve_effects(player: dict, enemy: dict) -> list:
+    """Tick all active effects once and drop expired ones. Untimed effects (turns == 0) persist."""
+    effects = player.setdefault("effects", {})
+    messages = []
+    for etype in list(effects):
+        amount, turns = effects[etype]
+        handler = TICK_HANDLERS.get(etype)
+        if handler:
+            messages.append(handler(player, enemy, amount))
+        if turns:
+            if turns <= 1:
+                del effects[etype]
+            else:
+                effects[etype][1] = turns - 1
+    return messages
+
 def use_item(player: dict, item_key: str) -> bool:
     inv = player.setdefault("inventory", {})
     if inv.get(item_key,0) <= 0:
         print("⚠️ You don't have that item.") ; return False
-    if item_key == "potion":
-        heal = 30
-        old = player["hp"]
-        player["hp"] = min(player["max_hp"], player["hp"] + heal)
-        actual = player["hp"] - old
-        inv[item_key] -= 1
-        print(f"🧪 You used a Healing Potion. Restored {actual} HP.")
-        return True
-    if item_key == "shield":
-        inv[item_key] -= 1
-        player["shield_active"] = True
-        print("🛡️ Shield activated. It will block the next hit.")
-        return True
-    print("⚠️ Unknown item."); return False
+    it = ITEMS.get(item_key)
+    if not it:
+        print("⚠️ Unknown item."); return False
+    inv[item_key] -= 1
+    print(f"🧪 You used {it['name']}.")
+    for spec in it["effects"]:
+        print(EFFECT_HANDLERS[spec["type"]](player, spec))
+    return True
 
 def show_inventory(player: dict):
     clear_screen()
@@ -533,18 +1362,19 @@ def show_inventory(player: dict):
 
 def shop_menu(player: dict):
     while True:
-        clear_screen()
-        print("🏪 Adventure Shop\n" + "─"*40)
-        for i,(k,it) in enumerate(ITEMS.items(),1):
-            print(f"{i}. {it['name']:<15} - {it['desc']}\n   Price: {it['price']} gold\n")
-        print("0. Exit Shop\n" + "─"*40)
-        print(f"💰 Your Gold: {player.get('gold',0)}\n")
+        stock = [k for k in ITEM_KEYS if ITEMS[k]["price"] > 0]
+        lines = ["🏪 Adventure Shop", "─"*40]
+        for i,k in enumerate(stock,1):
+            it = ITEMS[k]
+            lines += [f"{i}. {it['name']:<15} - {it['desc']}", f"   Price: {it['price']} gold", ""]
+        lines += ["0. Exit Shop", "─"*40, f"💰 Your Gold: {player.get('gold',0)}", ""]
+        render_screen(lines)
         choice = safe_input("👉 Enter item number to buy (or 0 to exit): ")
         if choice == "0": break
         try:
             idx = int(choice)-1
-            if 0 <= idx < len(ITEMS):
-                key = list(ITEMS.keys())[idx]
+            if 0 <= idx < len(stock):
+                key = stock[idx]
                 it = ITEMS[key]
                 if player.get("gold",0) >= it["price"]:
                     confirm = safe_input(f"Buy {it['name']} for {it['price']} gold? (Y/n): ").lower()
@@ -562,23 +1392,50 @@ def shop_menu(player: dict):
         except Exception:
             print("⚠️ Please enter a valid number."); press_enter()
 
-def battle(player: dict, enemy: dict, qs: list, diff: str="easy") -> bool:
+def _battle_result(record: dict, player: dict, enemy: dict, won: bool) -> tuple:
+    record["won"] = won
+    record["final"] = {"player": copy.deepcopy(player), "enemy_hp": enemy["hp"]}
+    return won, record
+
+def battle(player: dict, enemy: dict, qs: list, diff: str="easy", shuffle: bool=True, rng=None, ask=ask_question) -> tuple:
+    """Fight enemy until one side drops. Pass shuffle=False when qs is already in draw order.
+
+    All randomness comes from rng and every answer from ask. Returns (won, record), where record holds
+    the seed, the questions, the starting and final player, and every turn's action, so replay_battle
+    can re-run it.
+    """
+    rng = rng or random
+    time_limit = TIMED_MODE["seconds"] if TIMED_MODE["enabled"] else None
+    record = {"seed": enemy.get("seed"), "diff": diff, "bank": BANK["source_mtime"], "time_limit": time_limit,
+              "dev": {k: v for k, v in DEV_MODE.items() if v}, "questions": list(qs), "shuffle": shuffle,
+              "player": copy.deepcopy(player), "enemy": copy.deepcopy(enemy), "turns": []}
+    turns = record["turns"]
     if not qs:
-        print("⚠️ No questions available for this difficulty."); press_enter(); return False
-    player.setdefault("shield_active", False)
+        print("⚠️ No questions available for this difficulty."); press_enter()
+        return _battle_result(record, player, enemy, False)
+    player.setdefault("effects", {})
     questions_copy = qs.copy()
-    random.shuffle(questions_copy)
+    if shuffle:
+        rng.shuffle(questions_copy)
     qidx = 0
     while player["hp"] > 0 and enemy["hp"] > 0:
-        clear_screen()
-        print("╔" + "═"*40 + "╗")
-        print(f"{('⚔️ Battle vs ' + enemy['name']):^40}")
-        print("╚" + "═"*40 + "╝\n")
-        print(f"🧑 {player['name']}\n   {health_bar(player['hp'], player['max_hp'])}")
-        print(f"   ⚔️ Damage: {player['damage']} | 💥 Combo: {player['combo']} | ⭐ XP: {player['xp']}")
-        print(f"\n👹 {enemy['name']}\n   {health_bar(enemy['hp'], enemy['max_hp'])}\n   ⚔️ Damage: {enemy['damage']}")
-        if player.get("shield_active"): print("\n🛡️ Shield is active!")
-        print("\n" + "─"*40)
+        buff = effect_amount(player, "buff_damage")
+        shield = effect_amount(player, "shield")
+        render_hud([
+            "╔" + "═"*40 + "╗",
+            f"{('⚔️ Battle vs ' + enemy['name']):^40}",
+            "╚" + "═"*40 + "╝",
+            "",
+            f"🧑 {player['name']}",
+            f"   {health_bar(player['hp'], player['max_hp'])}",
+            f"   ⚔️ Damage: {player['damage']}{f' (+{buff})' if buff else ''} | 💥 Combo: {player['combo']} | ⭐ XP: {player['xp']}",
+            "",
+            f"👹 {enemy['name']}",
+            f"   {health_bar(enemy['hp'], enemy['max_hp'])}",
+            f"   ⚔️ Damage: {enemy['damage']}",
+            f"🛡️ Shield is active! ({shield} {'hit' if shield == 1 else 'hits'})" if shield else "",
+            "─"*40,
+        ])
         if DEV_MODE["instant_win"]:
             print("💻 Dev Mode: Instant Win!"); enemy["hp"] = 0; break
         print("\nOptions:\n[A] Answer question\n[I] Inventory\n[S] Use shop\n[Q] Quit battle (forfeit)")
@@ -586,42 +1443,66 @@ def battle(player: dict, enemy: dict, qs: list, diff: str="easy") -> bool:
         if opt == "i":
             show_inventory(player); continue
         if opt == "s":
-            shop_menu(player); continue
+            before = dict(player.get("inventory", {}))
+            shop_menu(player)
+            bought = {k: v - before.get(k, 0) for k, v in player.get("inventory", {}).items() if v > before.get(k, 0)}
+            if bought:
+                turns.append({"action": "shop", "bought": bought})
+            continue
         if opt == "q":
             confirm = safe_input("Are you sure you want to forfeit? (y/N): ").lower()
             if confirm in ['y','yes']:
-                print("You forfeited the battle."); press_enter(); return False
+                turns.append({"action": "forfeit"})
+                print("You forfeited the battle."); press_enter()
+                return _battle_result(record, player, enemy, False)
             continue
         if qidx >= len(questions_copy):
-            random.shuffle(questions_copy); qidx = 0
-        q = questions_copy[qidx]; qidx += 1
-        if ask_question(q):
+            rng.shuffle(questions_copy); qidx = 0
+        ref = q = questions_copy[qidx]; qidx += 1
+        if isinstance(q, int):
+            q = bank_question(q)
+        else:
+            ref = q.get("question")
+        correct, elapsed = ask(q, time_limit)
+        elapsed = round(elapsed, 3)  # the logged value is the one the speed bonus is computed from
+        turn = {"action": "answer", "q": ref, "correct": correct, "elapsed": elapsed}
+        turns.append(turn)
+        if correct:
             combo_bonus = min(player.get("combo",0), 10)
-            total_damage = player["damage"] + combo_bonus
+            fast = speed_bonus(elapsed, time_limit)
+            total_damage = player["damage"] + combo_bonus + fast + effect_amount(player, "buff_damage")
             print(f"✅ Correct! You deal {total_damage} damage!")
+            if fast:
+                print(f"⚡ Speed bonus +{fast} ({elapsed:.1f}s)")
             enemy["hp"] = max(0, enemy["hp"] - total_damage)
             player["combo"] = player.get("combo",0) + 1
-            score_reward = 50 + combo_bonus * 5
+            score_reward = 50 + combo_bonus * 5 + fast * 10
             player["score"] = player.get("score",0) + score_reward
+            post_score_event(player["name"], score_reward)
             print(f"💰 Score +{score_reward}")
-            if check_level_up(player):
-                pass
+            upgrades = check_level_up(player)
+            if upgrades:
+                turn["upgrades"] = upgrades
         else:
             print("❌ Wrong answer!")
             if DEV_MODE["god_mode"]:
                 print("💻 Dev Mode: No damage taken!")
             else:
-                if player.get("shield_active", False):
-                    print("🛡️ Your shield blocked the attack!"); player["shield_active"] = False
+                if absorb_hit(player):
+                    print("🛡️ Your shield blocked the attack!")
                 else:
                     dmg = enemy.get("damage", 0)
                     print(f"👹 {enemy['name']} hits you for {dmg} damage!")
                     player["hp"] = max(0, player["hp"] - dmg)
             player["combo"] = 0
+        if player["hp"] > 0:
+            for msg in resolve_effects(player, enemy):
+                print(msg)
         if enemy["hp"] <= 0:
             print(f"\n🎉 Victory! You defeated the {enemy['name']}!")
-            apply_victory_rewards(player, enemy, diff)
-            press_enter(); return True
+            apply_victory_rewards(player, enemy, diff, rng)
+            press_enter()
+            return _battle_result(record, player, enemy, True)
         if player["hp"] <= 0:
             print(f"\n💀 Defeat! You were defeated by the {enemy['name']}...")
             gold_loss = min(player.get("gold",0)//4, 50)
@@ -632,30 +1513,76 @@ def battle(player: dict, enemy: dict, qs: list, diff: str="easy") -> bool:
             if xp_loss: print(f"📉 Lost {xp_loss} XP")
             player["hp"] = player["max_hp"] // 4
             print(f"❤️ Recovered to {player['hp']} HP")
-            press_enter(); return False
+            press_enter()
+            return _battle_result(record, player, enemy, False)
         press_enter()
-    return player["hp"] > 0
+    if enemy["hp"] <= 0:
+        turns.append({"action": "instant_win"})
+    return _battle_result(record, player, enemy, player["hp"] > 0)
 
-def show_leaderboard():
-    load_leaderboard()
-    clear_screen()
-    print("🏆 Leaderboard\n" + "─"*50)
-    if not LEADERBOARD:
-        print("No scores yet.")
+def show_leaderboard(view: str = "all"):
+    """Draw one board: "all", a window kind from LEADERBOARD_WINDOWS, or "season-<key>" for an archived season."""
+    if view == "all":
+        load_leaderboard()
+        lines = [f"🏆 Leaderboard — {WINDOW_TITLES['all']}", "─"*50]
+        if not LEADERBOARD:
+            lines.append("No scores yet.")
+        else:
+            for i, e in enumerate(LEADERBOARD,1):
+                name = e.get("name","Unknown")[:10]
+                lines.append(f"{i:2}. {name:<10} | Score: {e.get('score',0):<6} | Lv: {e.get('level',1):<3} | XP: {e.get('xp',0)}")
+        lines.append("─"*50)
+        render_screen(lines); return
+    if view in LEADERBOARD_WINDOWS:
+        board = window_board(view)
+        key = window_key(view, time.time())
+        top = board_top(board, 10) if board["key"] == key else []
+        title = f"{WINDOW_TITLES[view]} ({key})"
     else:
-        for i, e in enumerate(LEADERBOARD,1):
-            name = e.get("name","Unknown")[:10]
-            print(f"{i:2}. {name:<10} | Score: {e.get('score',0):<6} | Lv: {e.get('level',1):<3} | XP: {e.get('xp',0)}")
-    print("─"*50)
+        key = view.split("-", 1)[1]
+        rollup = safe_json_load(os.path.join(LEADERBOARD_DIR, "archive", f"{view}.json")) or {}
+        top = [tuple(e) for e in rollup.get("top", [])[:10]]
+        title = f"Season {key} (archived, {rollup.get('players', 0)} players)"
+    lines = [f"🏆 Leaderboard — {title}", "─"*50]
+    if not top:
+        lines.append("No scores yet.")
+    for i, (name, pts) in enumerate(top, 1):
+        lines.append(f"{i:2}. {name[:10]:<10} | Points: {pts}")
+    lines.append("─"*50)
+    render_screen(lines)
+
+def leaderboard_menu():
+    views = {"1": "all", "2": "daily", "3": "weekly", "4": "season"}
+    view = "all"
+    while True:
+        show_leaderboard(view)
+        print("1. All-Time  2. Today  3. This Week  4. This Season  5. Past Seasons  0. Back")
+        choice = safe_input("👉 Choose view: ")
+        if choice in views:
+            view = views[choice]
+        elif choice == "5":
+            seasons = archived_windows("season")
+            if not seasons:
+                print("No archived seasons yet."); press_enter(); continue
+            for i, key in enumerate(seasons, 1):
+                print(f"{i}. Season {key}")
+            pick = get_valid_choice("👉 Choose season: ", [str(i) for i in range(1, len(seasons) + 1)])
+            view = f"season-{seasons[int(pick) - 1]}"
+        elif choice == "0" or not choice:
+            break
+        else:
+            print("⚠️ Invalid choice."); press_enter()
 
 def dev_menu():
     while True:
-        clear_screen()
-        print("🔧 Dev/Admin Menu\n" + "─"*35)
-        print(f"1. God Mode:     {'🟢 ON' if DEV_MODE['god_mode'] else '🔴 OFF'}")
-        print(f"2. Show Answers: {'🟢 ON' if DEV_MODE['show_answers'] else '🔴 OFF'}")
-        print(f"3. Instant Win:  {'🟢 ON' if DEV_MODE['instant_win'] else '🔴 OFF'}")
-        print("4. View All Users\n5. Reset Leaderboard\n6. Create Sample Questions\n7. View Questions Statistics\n8. Back to Main Menu")
+        render_screen([
+            "🔧 Dev/Admin Menu", "─"*35,
+            f"1. God Mode:     {'🟢 ON' if DEV_MODE['god_mode'] else '🔴 OFF'}",
+            f"2. Show Answers: {'🟢 ON' if DEV_MODE['show_answers'] else '🔴 OFF'}",
+            f"3. Instant Win:  {'🟢 ON' if DEV_MODE['instant_win'] else '🔴 OFF'}",
+            "4. View All Users", "5. Reset Leaderboard", "6. Create Sample Questions",
+            "7. View Questions Statistics", "8. Back to Main Menu",
+        ])
         choice = safe_input("👉 Choose: ")
         if choice == "1":
             DEV_MODE["god_mode"] = not DEV_MODE["god_mode"]; print("God Mode toggled."); press_enter()
@@ -671,11 +1598,28 @@ def dev_menu():
                     print(f"{i:2}. {u:<15} | Lv: {pd.get('level',1):<2} | Score: {pd.get('score',0)}")
             else:
                 print("No users registered.")
+            print(f"\n🗃️ Player cache: {len(PLAYER_CACHE)}/{PLAYER_CACHE_MAX_ENTRIES} | "
+                  f"hits {PLAYER_CACHE_STATS['hits']} | misses {PLAYER_CACHE_STATS['misses']} | "
+                  f"evictions {PLAYER_CACHE_STATS['evictions']} (size) + {PLAYER_CACHE_STATS['expirations']} (TTL)")
             press_enter()
         elif choice == "5":
-            c = safe_input("Reset leaderboard? (y/N): ").lower()
+            views = ("all",) + LEADERBOARD_WINDOWS
+            print("\n".join(f"{i}. {WINDOW_TITLES[v]}" for i, v in enumerate(views, 1)) + f"\n{len(views) + 1}. All boards")
+            pick = safe_input("Reset which leaderboard? ")
+            if pick == str(len(views) + 1):
+                targets = views
+            elif pick.isdigit() and 1 <= int(pick) <= len(views):
+                targets = (views[int(pick) - 1],)
+            else:
+                targets = ()
+            c = safe_input(f"Reset {', '.join(WINDOW_TITLES[v] for v in targets)}? (y/N): ").lower() if targets else ""
             if c in ('y','yes'):
-                save_leaderboard(); LEADERBOARD.clear(); safe_json_write(LEADERBOARD_FILE, LEADERBOARD); print("✅ Leaderboard reset.")
+                for v in targets:
+                    if v == "all":
+                        save_leaderboard(); LEADERBOARD.clear(); safe_json_write(LEADERBOARD_FILE, LEADERBOARD)
+                    else:
+                        reset_window_board(v)
+                print("✅ Leaderboard reset.")
             else:
                 print("❌ Reset cancelled.")
             press_enter()
@@ -690,14 +1634,14 @@ def dev_menu():
 
 def create_sample_questions():
     sample_questions = [
-        {"question":"What is 2 + 2?","options":["3","4","5","6"],"answer":"4","difficulty":"easy"},
-        {"question":"What is the capital of France?","options":["London","Berlin","Paris","Madrid"],"answer":"Paris","difficulty":"easy"},
-        {"question":"What is 15 × 8?","options":["110","120","130","140"],"answer":"120","difficulty":"medium"},
-        {"question":"Which planet is known as the Red Planet?","options":["Venus","Mars","Jupiter","Saturn"],"answer":"Mars","difficulty":"medium"},
-        {"question":"What is the square root of 144?","options":["11","12","13","14"],"answer":"12","difficulty":"hard"},
-        {"question":"Who wrote 'To Kill a Mockingbird'?","options":["Harper Lee","Mark Twain","Ernest Hemingway","F. Scott Fitzgerald"],"answer":"Harper Lee","difficulty":"hard"},
-        {"question":"What is the chemical symbol for Gold?","options":["Go","Gd","Au","Ag"],"answer":"Au","difficulty":"boss"},
-        {"question":"In which year did World War II end?","options":["1944","1945","1946","1947"],"answer":"1945","difficulty":"boss"}
+        {"question":"What is 2 + 2?","options":["3","4","5","6"],"answer":"4","difficulty":"easy","category":"math"},
+        {"question":"What is the capital of France?","options":["London","Berlin","Paris","Madrid"],"answer":"Paris","difficulty":"easy","category":"geography"},
+        {"question":"What is 15 × 8?","options":["110","120","130","140"],"answer":"120","difficulty":"medium","category":"math"},
+        {"question":"Which planet is known as the Red Planet?","options":["Venus","Mars","Jupiter","Saturn"],"answer":"Mars","difficulty":"medium","category":"science"},
+        {"question":"What is the square root of 144?","options":["11","12","13","14"],"answer":"12","difficulty":"hard","category":"math"},
+        {"question":"Who wrote 'To Kill a Mockingbird'?","options":["Harper Lee","Mark Twain","Ernest Hemingway","F. Scott Fitzgerald"],"answer":"Harper Lee","difficulty":"hard","category":"literature"},
+        {"question":"What is the chemical symbol for Gold?","options":["Go","Gd","Au","Ag"],"answer":"Au","difficulty":"boss","category":"science"},
+        {"question":"In which year did World War II end?","options":["1944","1945","1946","1947"],"answer":"1945","difficulty":"boss","category":"history"}
     ]
     if safe_json_write(QUESTION_FILE, sample_questions):
         print(f"✅ Created {QUESTION_FILE} with {len(sample_questions)} sample questions.")
@@ -706,16 +1650,33 @@ def create_sample_questions():
 
 def show_question_stats():
     try:
-        qs = load_questions()
+        bank = open_question_bank()
         clear_screen()
         print("📊 Question Statistics\n" + "─"*30)
-        total = len(qs)
-        print(f"Total Questions: {total}\nBy Difficulty:")
-        diffs = {}
-        for q in qs:
-            diffs[q.get("difficulty","unknown")] = diffs.get(q.get("difficulty","unknown"),0) + 1
+        print(f"Total Questions: {bank['count']}\nBy Difficulty:")
+        diffs, cats = {}, {}
+        for cat, pools in bank["pools"].items():
+            for d, (first, count) in pools.items():
+                diffs[d] = diffs.get(d, 0) + count
+                cats[cat] = cats.get(cat, 0) + count
         for d,c in sorted(diffs.items()):
             print(f"  {d.capitalize()}: {c}")
+        print("By Category:")
+        for cat,c in sorted(cats.items()):
+            print(f"  {cat.capitalize()}: {c}")
+        load_response_times()
+        if RESPONSE_TIMES:
+            print("\nResponse Times by Difficulty:")
+            labels = [f"≤{b}s" for b in RESPONSE_TIME_BUCKETS] + [f">{RESPONSE_TIME_BUCKETS[-1]}s"]
+            by_diff = {}
+            for rec in RESPONSE_TIMES.values():
+                agg = by_diff.setdefault(rec["difficulty"], {"count": 0, "total": 0.0, "buckets": [0] * len(labels)})
+                agg["count"] += rec["count"]; agg["total"] += rec["total"]
+                agg["buckets"] = [a + b for a, b in zip(agg["buckets"], rec["buckets"])]
+            for d, agg in sorted(by_diff.items()):
+                avg = agg["total"] / agg["count"] if agg["count"] else 0
+                hist = " ".join(f"{l}:{n}" for l, n in zip(labels, agg["buckets"]) if n)
+                print(f"  {d.capitalize()}: avg {avg:.1f}s over {agg['count']} answers | {hist}")
         print(f"\nFile: {QUESTION_FILE}")
     except Exception as e:
         print(f"⚠️ Error analyzing questions: {e}")
@@ -728,8 +1689,6 @@ def use_item_menu(player: dict):
         if not available:
             print("🎒 No usable items in inventory."); press_enter(); return
         print("Available Items:")
-        for i,(k,q,it) in enumerate([(a[0],a[1],a[2]) for a in available],1):
-            pass
         for i, (key, qty, info) in enumerate(available,1):
             print(f"{i}. {info['name']} x{qty} - {info['desc']}")
         print("0. Back to main menu")
@@ -749,35 +1708,60 @@ def use_item_menu(player: dict):
         except Exception:
             print("⚠️ Please enter a valid number."); press_enter()
 
-def battle_menu(player: dict, username: str, questions: list):
+def choose_category(current: Optional[str]) -> Optional[str]:
+    cats = bank_categories()
+    lines = ["📚 Choose a Question Category", "─"*30, f"0. 🌐 All categories{' ✅' if current is None else ''}"]
+    lines += [f"{i}. {c.capitalize()}{' ✅' if c == current else ''}" for i, c in enumerate(cats, 1)]
+    render_screen(lines)
+    choice = get_valid_choice("👉 Choose: ", [str(i) for i in range(len(cats) + 1)])
+    return None if choice == "0" else cats[int(choice) - 1]
+
+def battle_menu(player: dict, username: str):
+    category = None
     while True:
-        clear_screen()
-        print("⚔️ Choose Your Battle!\n" + "─"*30)
-        print("1. 🟢 Easy Battle   (Slimes)\n2. 🟡 Medium Battle (Goblins)\n3. 🔴 Hard Battle   (Orcs)\n4. 💀 Boss Battle   (Dragons)\n5. 🏠 Return to Main Menu")
-        print(f"\n📊 Your Stats: Lv.{player['level']} | {health_bar(player['hp'], player['max_hp'], 12)}")
+        open_question_bank()
+        if category is not None and category not in BANK["pools"]:
+            category = None
+        render_screen([
+            "⚔️ Choose Your Battle!", "─"*30,
+            "1. 🟢 Easy Battle   (Slimes)", "2. 🟡 Medium Battle (Goblins)", "3. 🔴 Hard Battle   (Orcs)", "4. 💀 Boss Battle   (Dragons)",
+            f"5. ⏱️ Timed Answers: {'🟢 ON' if TIMED_MODE['enabled'] else '🔴 OFF'} ({TIMED_MODE['seconds']:g}s)",
+            f"6. 📚 Category: {category.capitalize() if category else 'All'}",
+            f"7. 🏰 Gauntlet Run ({GAUNTLET_LENGTH} enemies)",
+            "8. 🏠 Return to Main Menu", "",
+            f"📊 Your Stats: Lv.{player['level']} | {health_bar(player['hp'], player['max_hp'], 12)}",
+        ])
         diff_choice = safe_input("👉 Choose your challenge: ")
-        if diff_choice == "5": break
+        if diff_choice == "8": break
+        if diff_choice == "5":
+            TIMED_MODE["enabled"] = not TIMED_MODE["enabled"]; continue
+        if diff_choice == "6":
+            category = choose_category(category); continue
+        if diff_choice == "7":
+            if player["hp"] <= 0:
+                print("⚠️ You need to heal before battling!"); press_enter(); continue
+            gauntlet_run(player, username, category); continue
         mapping = {"1":"easy","2":"medium","3":"hard","4":"boss"}
         if diff_choice not in mapping:
             print("⚠️ Invalid choice."); press_enter(); continue
         diff = mapping[diff_choice]
         if player["hp"] <= 0:
             print("⚠️ You need to heal before battling!"); press_enter(); continue
-        filtered = [q for q in questions if (diff == "medium" and q.get("difficulty") in ("easy","medium")) or
-                    (diff == "hard" and q.get("difficulty") in ("medium","hard")) or
-                    (diff == "easy" and q.get("difficulty") == "easy") or
-                    (diff == "boss" and q.get("difficulty") == "boss") or
-                    (diff not in ("easy","medium","hard","boss"))]
+        filtered = bank_pool(category, BATTLE_POOLS[diff])
         if not filtered:
-            filtered = questions
-        enemy = make_enemy(diff, player["level"])
+            filtered = bank_pool(category, ("easy", "medium", "hard", "boss"))
+        seed = next_battle_seed()
+        enemy = make_enemy(diff, player["level"], seeded_rng(seed, "enemy"))
+        enemy["seed"] = seed
         print(f"\n🎯 Preparing {diff.capitalize()} battle against {enemy['name']}...")
         print(f"👹 Enemy: {health_bar(enemy['hp'], enemy['max_hp'], 12)} | ⚔️ {enemy['damage']}")
         confirm = safe_input("Ready to fight? (Y/n): ").lower()
         if confirm not in ('','y','yes'):
             print("❌ Battle cancelled."); press_enter(); continue
-        result = battle(player, enemy, filtered, diff)
+        result, record = battle(player, enemy, filtered, diff, rng=seeded_rng(seed, "battle"))
+        record_battle(username, record)
         save_player(username, player)
+        save_response_times()
         update_leaderboard_with_player(player)
         if result:
             if diff == "boss":
@@ -797,21 +1781,225 @@ def battle_menu(player: dict, username: str, questions: list):
         else:
             print("💀 Perhaps try an easier difficulty or heal up first..."); press_enter(); break
 
-def player_game_loop(player: dict, username: str, questions: list):
+def make_gauntlet(length: int, player_level: int, seed: int) -> list:
+    """Generate every enemy of a gauntlet run up front, escalating from easy to boss."""
+    diffs = ("easy", "medium", "hard", "boss")
+    enemies = []
+    for i in range(length):
+        diff = diffs[min(len(diffs) - 1, i * len(diffs) // length)]
+        enemy_seed = derive_seed(seed, i)
+        enemy = make_enemy(diff, player_level + i // 2, seeded_rng(enemy_seed, "enemy"))
+        enemy["diff"] = diff
+        enemy["seed"] = enemy_seed
+        enemies.append(enemy)
+    return enemies
+
+def record_battle(username: str, record: dict) -> bool:
+    """Append a battle record returned by battle() to BATTLE_LOG_FILE so it can be replayed and verified."""
+    entry = {"time": int(time.time()), "user": username, **record}
+    try:
+        ensure_dirs()
+        with open(BATTLE_LOG_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        return True
+    except Exception as e:
+        print(f"⚠️ Error saving {BATTLE_LOG_FILE}: {e}")
+        return False
+
+def _replay_lines(turns: list) -> list:
+    """The menu input that makes battle() take the logged turns."""
+    stock = [k for k in ITEM_KEYS if ITEMS[k]["price"] > 0]
+    choices = {"max_hp": "1", "damage": "2", "gold_bonus": "3"}
+    lines = []
+    for t in turns:
+        if t["action"] == "answer":
+            lines.append("")
+            lines += [choices[u] for u in t.get("upgrades", [])]
+        elif t["action"] == "shop":
+            lines.append("s")
+            for key, qty in t["bought"].items():
+                lines += [str(stock.index(key) + 1) if key in stock else "?", "y"] * qty
+            lines.append("0")
+        elif t["action"] == "forfeit":
+            lines += ["q", "y"]
+    return lines
+
+def replay_battle(record: dict) -> list:
+    """Re-run a battle logged by record_battle from its seed and turns.
+
+    Returns how the replay differs from the record; an empty list means the record is consistent.
+    """
+    if "final" not in record or "questions" not in record:
+        return ["record predates replay logging"]
+    if record.get("bank") != open_question_bank()["source_mtime"]:
+        return ["question bank changed since the battle"]
+    problems = []
+    player, logged = copy.deepcopy(record["player"]), record["enemy"]
+    enemy = make_enemy(logged.get("diff", record["diff"]), logged.get("level", player["level"]), seeded_rng(record["seed"], "enemy"))
+    enemy.update({k: logged[k] for k in ("diff", "seed") if k in logged})
+    if enemy != logged:
+        problems.append("enemy does not match its seed")
+    answers = iter([t for t in record["turns"] if t["action"] == "answer"])
+    def ask(q, time_limit):
+        t = next(answers, None)
+        if t is None:
+            raise ScriptExhausted()
+        return t["correct"], t["elapsed"]
+    try:
+        lines = _replay_lines(record["turns"])
+    except (KeyError, TypeError, ValueError):
+        return problems + ["malformed turns"]
+    saved = (dict(INPUT), dict(DEV_MODE), dict(TIMED_MODE), dict(RENDER), list(HUD_CACHE), list(PENDING_SCORE_EVENTS), sys.stdout)
+    INPUT.update(script=lines, pos=0, fast=True)
+    DEV_MODE.update({k: bool(record.get("dev", {}).get(k)) for k in DEV_MODE})
+    TIMED_MODE.update(enabled=record.get("time_limit") is not None, seconds=record.get("time_limit") or TIMED_MODE["seconds"])
+    RENDER["mode"] = "plain"
+    sys.stdout = open(os.devnull, "w", encoding="utf-8")
+    try:
+        won, replayed = battle(player, enemy, record["questions"], record["diff"], record.get("shuffle", True),
+                               seeded_rng(record["seed"], "battle"), ask=ask)
+        if INPUT["pos"] < len(lines) or next(answers, None) is not None:
+            problems.append("battle ended before the logged turns did")
+    except ScriptExhausted:
+        return problems + ["logged turns end before the battle does"]
+    finally:
+        sys.stdout.close()
+        INPUT.clear(); INPUT.update(saved[0]); DEV_MODE.update(saved[1]); TIMED_MODE.update(saved[2]); RENDER.update(saved[3])
+        HUD_CACHE[:] = saved[4]; PENDING_SCORE_EVENTS[:] = saved[5]; sys.stdout = saved[6]
+    if replayed["turns"] != record["turns"]:
+        problems.append("questions asked do not match the seed")
+    if won != record["won"]:
+        problems.append(f"replay {'won' if won else 'lost'}, record says {'won' if record['won'] else 'lost'}")
+    final = record["final"]
+    if replayed["final"]["player"]["hp"] != final["player"].get("hp") or replayed["final"]["enemy_hp"] != final.get("enemy_hp"):
+        problems.append(f"final HP {replayed['final']['player']['hp']}/{replayed['final']['enemy_hp']}, "
+                        f"record says {final['player'].get('hp')}/{final.get('enemy_hp')}")
+    elif replayed["final"]["player"] != final["player"]:
+        problems.append("final player stats differ")
+    return problems
+
+def verify_battle_log(path: str) -> int:
+    """Replay every record in a battle log, print the ones that do not match, and return how many."""
+    bad = total = 0
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                total += 1
+                try:
+                    problems = replay_battle(json.loads(line))
+                except Exception as e:
+                    problems = [f"{type(e).__name__}: {e}"]
+                if problems:
+                    bad += 1
+                    print(f"❌ Line {n}: {'; '.join(problems)}")
+    except OSError as e:
+        print(f"⚠️ Error reading {path}: {e}")
+        return 1
+    print(f"🔎 {total - bad}/{total} battles replayed to the logged outcome")
+    return bad
+
+def load_gauntlet_checkpoint(username: str, player: dict) -> Optional[dict]:
+    """Return the saved run for username, or None if there is none, the player has progressed since it
+    started, or the question bank its record numbers refer to has been rebuilt."""
+    cp = safe_json_load(gauntlet_checkpoint_path(username))
+    if not isinstance(cp, dict):
+        return None
+    try:
+        if cp["start_score"] != player["score"] or not 0 < cp["stage"] < len(cp["enemies"]):
+            raise ValueError("stale checkpoint")
+        if cp["bank"] != open_question_bank()["source_mtime"]:
+            raise ValueError("question bank rebuilt since checkpoint")
+        cp["player"] = normalize_player(cp["player"])
+        cp.setdefault("cursor", 0)
+        return cp
+    except Exception:
+        try:
+            os.remove(gauntlet_checkpoint_path(username))
+        except OSError:
+            pass
+        return None
+
+def gauntlet_run(player: dict, username: str, category: Optional[str]):
+    """Fight a pre-generated sequence of enemies back to back.
+
+    Stages draw their questions in turn from one shuffled stream: cp["cursor"] is the stream position
+    the next stage starts at, wrapping only once the stream runs out. A checkpoint is written after
+    each cleared stage; the player save and leaderboard are only committed once, when the run ends.
+    """
+    cp = load_gauntlet_checkpoint(username, player)
+    if cp and safe_input(f"🏰 Resume your gauntlet at stage {cp['stage'] + 1}/{len(cp['enemies'])}? (Y/n): ").lower() in ('','y','yes'):
+        player.clear(); player.update(cp["player"])
+        PENDING_SCORE_EVENTS.extend(tuple(e) for e in cp.get("pending", []))
+    else:
+        stream = bank_pool(category, ("easy", "medium", "hard", "boss"))
+        if not stream:
+            print("⚠️ No questions available for this category."); press_enter(); return
+        seed = next_battle_seed()
+        seeded_rng(seed, "stream").shuffle(stream)
+        cp = {"seed": seed, "bank": BANK["source_mtime"], "start_score": player["score"], "stage": 0,
+              "category": category, "stream": stream, "cursor": 0,
+              "enemies": make_gauntlet(GAUNTLET_LENGTH, player["level"], seed)}
+        print(f"\n🏰 Gauntlet: {' → '.join(e['name'] for e in cp['enemies'])}")
+        confirm = safe_input("Enter the gauntlet? (Y/n): ").lower()
+        if confirm not in ('','y','yes'):
+            print("❌ Gauntlet cancelled."); press_enter(); return
+    enemies, stream = cp["enemies"], cp["stream"]
+    won = True
+    while cp["stage"] < len(enemies):
+        enemy = enemies[cp["stage"]]
+        pool = set(bank_pool(cp["category"], BATTLE_POOLS[enemy["diff"]]))
+        order = [(cp["cursor"] + k) % len(stream) for k in range(len(stream))]
+        order = [i for i in order if stream[i] in pool] or order
+        print(f"\n🏰 Stage {cp['stage'] + 1}/{len(enemies)}: {enemy['name']}"); press_enter()
+        won, record = battle(player, enemy, [stream[i] for i in order], enemy["diff"], shuffle=False,
+                             rng=seeded_rng(enemy["seed"], "battle"))
+        record["gauntlet"] = {"seed": cp["seed"], "stage": cp["stage"], "cursor": cp["cursor"]}
+        record_battle(username, record)
+        used = sum(t["action"] == "answer" for t in record["turns"])
+        if used:
+            cp["cursor"] = (order[min(used, len(order)) - 1] + 1) % len(stream)
+        if not won:
+            break
+        cp["stage"] += 1
+        cp["player"] = player
+        cp["pending"] = PENDING_SCORE_EVENTS  # score events of cleared stages, committed with the run
+        if cp["stage"] < len(enemies):
+            safe_json_write(gauntlet_checkpoint_path(username), cp)
+    if won:
+        bonus_gold, bonus_score = 25 * len(enemies), 100 * len(enemies)
+        player["gold"] += bonus_gold; player["score"] += bonus_score
+        post_score_event(player["name"], bonus_score)
+        print(f"\n🏆 Gauntlet cleared! Bonus: +{bonus_gold} gold, +{bonus_score} score")
+    else:
+        print(f"\n💀 Your gauntlet ended at stage {cp['stage'] + 1}/{len(enemies)}.")
+    try:
+        os.remove(gauntlet_checkpoint_path(username))
+    except OSError:
+        pass
+    save_player(username, player)
+    save_response_times()
+    update_leaderboard_with_player(player)
+    press_enter()
+
+def player_game_loop(player: dict, username: str):
     while True:
-        clear_screen()
         req = get_xp_required(player['level'])
         xp_progress = f"{player['xp']}/{req}"
-        print(f"╔{'═'*35}╗\n  Welcome back, {player['name'][:15]}!\n╚{'═'*35}╝\n")
-        print(f"   Level: {player['level']} | XP: {xp_progress} ({(player['xp']/req)*100:.1f}%)")
-        print(f"   {health_bar(player['hp'], player['max_hp'], 15)}")
-        print(f"   💰 Gold: {player.get('gold', 0)} | 🏆 Score: {player['score']}\n")
-        print("🎮 Game Menu:\n1. 🗡️  Battle Enemies\n2. 🏆 View Leaderboard\n3. 🎒 Check Inventory\n4. 🏪 Visit Shop\n5. 🧪 Use Item\n6. 💾 Save & Logout")
+        render_screen([
+            f"╔{'═'*35}╗", f"  Welcome back, {player['name'][:15]}!", f"╚{'═'*35}╝", "",
+            f"   Level: {player['level']} | XP: {xp_progress} ({(player['xp']/req)*100:.1f}%)",
+            f"   {health_bar(player['hp'], player['max_hp'], 15)}",
+            f"   💰 Gold: {player.get('gold', 0)} | 🏆 Score: {player['score']}", "",
+            "🎮 Game Menu:", "1. 🗡️  Battle Enemies", "2. 🏆 View Leaderboard", "3. 🎒 Check Inventory",
+            "4. 🏪 Visit Shop", "5. 🧪 Use Item", "6. 💾 Save & Logout",
+        ])
         choice = get_valid_choice("\n👉 Choose your action: ", ["1","2","3","4","5","6"])
         if choice == "1":
-            battle_menu(player, username, questions)
+            battle_menu(player, username)
         elif choice == "2":
-            show_leaderboard(); press_enter()
+            leaderboard_menu()
         elif choice == "3":
             show_inventory(player)
         elif choice == "4":
@@ -832,21 +2020,21 @@ def player_game_loop(player: dict, username: str, questions: list):
 def main():
     try:
         ensure_dirs()
-        load_users(); load_admins(); load_questions(); load_leaderboard()
+        load_users(); load_admins(); open_question_bank(); load_items(); load_leaderboard(); load_response_times()
         print("🎮 Loading Quiz Battle Game...")
-        print(f"✅ Game ready with {len(QUESTIONS)} questions!")
+        print(f"✅ Game ready with {BANK['count']} questions!")
         while True:
-            clear_screen()
-            print("╔" + "═"*40 + "╗")
-            print("       ⚔️ Quiz Battle Game (Public Test Build) 1.1 ⚔️")
-            print("╚" + "═"*40 + "╝\n")
-            print("🎯 Test your knowledge in epic battles!\n")
-            print("1️⃣ Play Game (Login/Register)\n2️⃣ Admin Panel\n3️⃣ View Leaderboard\n4️⃣ Quit Game")
+            render_screen([
+                "╔" + "═"*40 + "╗",
+                "       ⚔️ Quiz Battle Game (Public Test Build) 1.1 ⚔️",
+                "╚" + "═"*40 + "╝", "",
+                "🎯 Test your knowledge in epic battles!", "",
+                "1️⃣ Play Game (Login/Register)", "2️⃣ Admin Panel", "3️⃣ View Leaderboard", "4️⃣ Quit Game",
+            ])
             choice = get_valid_choice("\n👉 Choose your adventure: ", ["1","2","3","4"])
             if choice == "1":
-                clear_screen()
-                print("🔐 Player Access\n" + "─"*30)
-                print("1. Login to existing account\n2. Create new account\n3. Reset forgotten password\n4. Back to main menu")
+                render_screen(["🔐 Player Access", "─"*30, "1. Login to existing account", "2. Create new account",
+                               "3. Change password", "4. Back to main menu"])
                 sub = get_valid_choice("👉 Choose: ", ["1","2","3","4"])
                 username = None
                 if sub == "1":
@@ -860,20 +2048,146 @@ def main():
                 if not username:
                     continue
                 player = load_player(username)
-                player_game_loop(player, username, QUESTIONS)
+                player_game_loop(player, username)
             elif choice == "2":
                 clear_screen(); print("🔑 Admin Access Required")
                 if login_account(is_admin=True):
                     dev_menu()
             elif choice == "3":
-                show_leaderboard(); press_enter()
+                leaderboard_menu()
             elif choice == "4":
                 print("👋 Thanks for playing Quiz Battle Game!\n💫 Your progress has been saved. See you next time!")
                 break
     except KeyboardInterrupt:
         print("\n\n👋 Game interrupted. Your progress has been saved!")
     except Exception as e:
+        if INPUT["script"] is not None:
+            raise  # run_script reports it as a failed session
         print(f"\n⚠️ An unexpected error occurred: {e}\nPlease restart the game. Your progress should be saved.")
 
+def load_script(path: str) -> list:
+    """Read a session script: one input line per line, blank lines are Enter presses.
+
+    A leading RECORD_SEED_HEADER line (written by --record) sets the session seed.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    if lines and lines[0].startswith(RECORD_SEED_HEADER):
+        RNG["session_seed"] = int(lines.pop(0)[len(RECORD_SEED_HEADER):])
+    return lines
+
+def use_data_dir(path: str):
+    """Switch all game files to path, seeding it with the current questions and items."""
+    os.makedirs(path, exist_ok=True)
+    for name in (QUESTION_FILE, ITEMS_FILE):
+        target = os.path.join(path, name)
+        if os.path.exists(name) and not os.path.exists(target):
+            shutil.copy2(name, target)
+    os.chdir(path)
+
+def run_script(lines: list, fast: bool = True) -> Optional[str]:
+    """Play one full session from scripted input lines. Returns why it failed, or None if it ran cleanly.
+
+    A session fails if it raises, runs out of lines, or quits with lines left over.
+    """
+    INPUT["script"] = lines
+    INPUT["pos"] = 0
+    INPUT["fast"] = fast
+    INPUT["sessions"] += 1
+    CONNECTION["id"] = f"script-{INPUT['sessions']}"  # each scripted session stands in for one client
+    RNG["counter"] = 0  # so every repeat of a seeded script draws the same battles
+    PLAYER_CACHE.clear(); WINDOW_BOARDS.clear(); PENDING_SCORE_EVENTS.clear(); RATE_BUCKETS.clear()
+    if fast:
+        RENDER["mode"] = "plain"
+    try:
+        main()
+    except ScriptExhausted:
+        return f"ran out of input after {len(lines)} lines"
+    except Exception as e:
+        traceback.print_exc()
+        return f"{type(e).__name__}: {e}"
+    finally:
+        INPUT["script"] = None
+    if INPUT["pos"] < len(lines):
+        return f"quit with {len(lines) - INPUT['pos']} of {len(lines)} lines unused"
+    return None
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Quiz Battle Game")
+    parser.add_argument("--script", help="replay input lines from this file instead of the keyboard")
+    parser.add_argument("--record", help="write every typed input line and the session seed to this file "
+                                         "(replayable with --script; passwords are masked)")
+    parser.add_argument("--fast", action="store_true", help="with --script: skip pauses and screen redraws")
+    parser.add_argument("--repeat", type=int, default=1, help="with --script: play the script this many times, "
+                                                               "each session in its own subdirectory of the data directory")
+    parser.add_argument("--quiet", action="store_true", help="with --script: discard game output")
+    parser.add_argument("--seed", type=int, help="session seed, making enemies, drops and question order reproducible")
+    parser.add_argument("--verify", metavar="LOG", help="replay every battle in a battle log (saves/battles.jsonl) "
+                                                       "and report records whose outcome does not match")
+    parser.add_argument("--simulate", type=int, metavar="N", help="roll N enemies per difficulty at --level and print stat ranges")
+    parser.add_argument("--level", type=int, default=1, help="with --simulate: player level to scale enemies for")
+    parser.add_argument("--data-dir", help="keep accounts, saves and leaderboards in this directory "
+                                           "(--script runs default to a fresh temporary directory)")
+    args = parser.parse_args(argv)
+    if args.script:
+        args.script = os.path.abspath(args.script)
+        if not args.data_dir:
+            args.data_dir = tempfile.mkdtemp(prefix="quiz_battle_")
+        args.data_dir = os.path.abspath(args.data_dir)
+    if args.record:
+        args.record = os.path.abspath(args.record)
+    if args.verify:
+        args.verify = os.path.abspath(args.verify)
+    if args.data_dir:
+        use_data_dir(args.data_dir)
+    lines = load_script(args.script) if args.script else None
+    if args.seed is not None:
+        RNG["session_seed"] = args.seed
+    if args.simulate:
+        for i, diff in enumerate(ENEMY_BASES):
+            st = simulate_enemy_stats(diff, args.level, args.simulate, derive_seed(session_seed(), f"simulate-{i}"))
+            print(f"{diff.capitalize():<7} | HP {st['hp']['min']}-{st['hp']['max']} (avg {st['hp']['mean']:.1f}) | "
+                  f"Damage {st['damage']['min']}-{st['damage']['max']} (avg {st['damage']['mean']:.1f})")
+        return 0
+    if args.verify:
+        open_question_bank(); load_items()
+        return 1 if verify_battle_log(args.verify) else 0
+    if not args.script:
+        if args.record:
+            INPUT["record"] = open(args.record, "w", encoding="utf-8")
+            INPUT["record"].write(f"{RECORD_SEED_HEADER}{session_seed()}\n")
+        try:
+            main()
+        finally:
+            if INPUT["record"] is not None:
+                INPUT["record"].close()
+                INPUT["record"] = None
+        return 0
+    repeat = max(1, args.repeat)
+    failures = []
+    out = sys.stdout
+    if args.quiet:
+        sys.stdout = open(os.devnull, "w", encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        for i in range(1, repeat + 1):
+            if repeat > 1:
+                os.chdir(args.data_dir)
+                use_data_dir(os.path.join(args.data_dir, f"session-{i}"))
+            reason = run_script(lines, fast=args.fast)
+            if reason:
+                failures.append((i, reason))
+    finally:
+        if args.quiet:
+            sys.stdout.close()
+            sys.stdout = out
+    elapsed = time.perf_counter() - start
+    for i, reason in failures:
+        print(f"❌ Session {i}: {reason}", file=sys.stderr)
+    if repeat > 1:
+        print(f"⏱️ {repeat} sessions in {elapsed:.2f}s ({repeat / elapsed:.0f}/s), {len(failures)} failed")
+    print(f"📁 Game data written to {args.data_dir}")
+    return 1 if failures else 0
+
 if __name__ == "__main__":
-    main()
+    sys.exit(run_cli())